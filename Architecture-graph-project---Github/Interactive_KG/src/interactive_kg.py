@@ -1,416 +1,440 @@
 import pandas as pd
-import networkx as nx
+import numpy as np
+import io
 import json
+import zlib
+try:
+    import orjson
+except ImportError:
+    # orjson is optional: fall back to the standard library encoder
+    orjson = None
+import itertools
+import difflib
+import hashlib
+import functools
 import streamlit as st
 import streamlit.components.v1 as components
 from pathlib import Path
 import base64
 
+GRAPH_COLUMNS = {'node': str, 'parent': str, 'type': str, 'relationship': str}
+
+# Above this many nodes the start/end pickers search server-side and offer at most NODE_PICKER_MATCHES names
+NODE_PICKER_LIMIT = 1000
+NODE_PICKER_MATCHES = 50
+
+# Path filter results kept per graph, keyed on (start, end, cutoff)
+PATH_CACHE_SIZE = 32
+
+# Neighbor visits the exact simple-path search may spend before falling back to an approximate filter
+PATH_SEARCH_STEPS = 1_000_000
+
+# Graphs above this size start with the server-side (frozen) layout instead of live browser physics
+FREEZE_LAYOUT_NODES = 2000
+
+# Live layouts above this size start from the server-side layout and only settle in the browser
+SEED_LAYOUT_NODES = 1000
+
+@st.cache_data(show_spinner=False)
+def _load_df(file_bytes, file_name):
+    # Parsed once per file content; widget reruns hit the cache instead of re-reading the workbook
+    if file_name.endswith('.parquet'):
+        return pd.read_parquet(io.BytesIO(file_bytes), columns=list(GRAPH_COLUMNS))
+    try:
+        return pd.read_excel(io.BytesIO(file_bytes), engine='calamine', usecols=list(GRAPH_COLUMNS), dtype=GRAPH_COLUMNS)
+    except (ImportError, ValueError):
+        # python-calamine not installed (ImportError), or pandas < 2.2 without the engine (ValueError):
+        # stream the sheet with openpyxl instead
+        return _stream_excel(file_bytes)
+
+def _stream_excel(file_bytes):
+    # Read-only openpyxl walks the sheet row by row and only the graph columns are kept,
+    # so wide workbooks never get a full DataFrame built for them
+    from openpyxl import load_workbook
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        idx = [header.index(col) for col in GRAPH_COLUMNS]
+        columns = {col: [] for col in GRAPH_COLUMNS}
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in idx]
+            if all(v is None for v in values):
+                continue
+            for col, v in zip(columns, values):
+                columns[col].append(None if v is None else str(v))
+    finally:
+        wb.close()
+    return pd.DataFrame(columns, dtype=object)
+
+def _file_bytes(excel_file):
+    if isinstance(excel_file, (str, Path)):
+        return Path(excel_file).read_bytes(), str(excel_file)
+    return excel_file.getvalue(), getattr(excel_file, 'name', '')
+
+def _force_layout(n_nodes, src, dst, iterations=300, seed=42, grid=128):
+    # Fruchterman-Reingold with particle-mesh repulsion: node density is binned on a grid and the
+    # k^2 / r repulsion is applied as one FFT convolution, so an iteration costs O(n + grid^2 log grid)
+    rng = np.random.default_rng(seed)
+    pos = rng.random((n_nodes, 2))
+    k = np.sqrt(1.0 / n_nodes)
+
+    # Kernel offsets (in cells) for a zero-padded, non-periodic convolution
+    offsets = np.fft.fftfreq(2 * grid, 1.0 / (2 * grid))
+    off_x, off_y = np.meshgrid(offsets, offsets, indexing='ij')
+    r2 = off_x ** 2 + off_y ** 2
+    r2[0, 0] = np.inf
+    # Kernels in units of cells; only the cell size h changes between iterations, and the field scales with 1 / h
+    kernels = [np.fft.rfft2(k * k * off / r2) for off in (off_x, off_y)]
+
+    temperature = 0.5
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        origin = pos.min(0)
+        h = (pos.max(0) - origin).max() / (grid - 1) + 1e-12
+        cell = np.minimum(((pos - origin) / h).astype(np.int64), grid - 1)
+        flat = cell[:, 0] * grid + cell[:, 1]
+        counts = np.bincount(flat, minlength=grid * grid)
+
+        density = np.zeros((2 * grid, 2 * grid))
+        density[:grid, :grid] = counts.reshape(grid, grid)
+        density_f = np.fft.rfft2(density)
+        disp = np.empty_like(pos)
+        for axis, kernel in enumerate(kernels):
+            field = np.fft.irfft2(density_f * kernel, s=density.shape)[:grid, :grid] / h
+            disp[:, axis] = field.ravel()[flat]
+            # Nodes sharing a cell get no mesh force from each other; push them off the cell centroid instead
+            centroid = np.bincount(flat, pos[:, axis], minlength=grid * grid) / np.maximum(counts, 1)
+            disp[:, axis] += (pos[:, axis] - centroid[flat]) * 4 * k * k / (h * h)
+
+        # Springs along edges
+        delta = pos[src] - pos[dst]
+        pull = delta * (np.sqrt((delta ** 2).sum(1)) / k)[:, None]
+        np.subtract.at(disp, src, pull)
+        np.add.at(disp, dst, pull)
+
+        length = np.maximum(np.sqrt((disp ** 2).sum(1)), 0.01)
+        pos += disp * (temperature / length)[:, None]
+        temperature -= cooling
+    return pos
+
+@st.cache_resource(show_spinner=False)
+def build_kg(file_bytes, file_name):
+    # One graph per uploaded file content; widget reruns reuse the built arrays and payloads
+    buffer = io.BytesIO(file_bytes)
+    buffer.name = file_name
+    return HierarchicalKnowledgeGraph(buffer)
+
 class HierarchicalKnowledgeGraph:
     def __init__(self, excel_file):
-        self.df = pd.read_excel(excel_file)
-        self.G = nx.Graph()
-        self.load_initial_graph()
-        self.visible_nodes = set()
-        self.visible_edges = set()
-
-    def load_initial_graph(self):
-        for _, row in self.df.iterrows():
-            node = str(row['node'])
-            parent = str(row['parent']) if pd.notnull(row['parent']) else None
-            
-            self.G.add_node(node, type=row['type'])
-            if parent and parent != 'nan':
-                self.G.add_edge(parent, node, relationship=row['relationship'])
+        # The frame is only needed while building; _load_df's cache already keeps a copy
+        df = _load_df(*_file_bytes(excel_file))
+        self.load_initial_graph(df)
+
+    def load_initial_graph(self, df):
+        # Pull the columns out once; the graph is stored as flat arrays rather than NetworkX dicts
+        arr = df[['node', 'parent', 'type', 'relationship']].to_numpy(dtype=object)
+        nodes = arr[:, 0].astype(str)
+        parents = arr[:, 1]
+
+        mask = pd.notnull(parents)
+        parents = parents[mask].astype(str)
+        keep = parents != 'nan'
+        edge_rows = np.flatnonzero(mask)[keep]
+        parents = parents[keep]
+
+        # Integer node ids from a categorical over every name in either column (sorted)
+        node_cat = pd.Categorical(np.concatenate([nodes, parents]))
+        codes = node_cat.codes.astype(np.int32)
+        node_ids, parent_ids = codes[:len(nodes)], codes[len(nodes):]
+        self.node_index = node_cat.categories
+        n_nodes = len(self.node_index)
+
+        # Later rows win for repeated nodes; names that only appear as a parent have no type
+        row_types = pd.Categorical(arr[:, 2])
+        type_codes = np.full(n_nodes, -1, dtype=row_types.codes.dtype)
+        type_codes[node_ids] = row_types.codes
+        self.type_cat = pd.Categorical.from_codes(type_codes, categories=row_types.categories)
+
+        # Undirected edges, de-duplicated keeping the last row for each node pair
+        src, dst = parent_ids, node_ids[edge_rows]
+        pair = np.minimum(src, dst).astype(np.int64) * n_nodes + np.maximum(src, dst)
+        _, last = np.unique(pair[::-1], return_index=True)
+        kept = np.sort(len(pair) - 1 - last)
+        self.edge_src, self.edge_dst = src[kept], dst[kept]
+        self.rel_cat = pd.Categorical(arr[edge_rows[kept], 3])
+        self._rel_table = np.append(self.rel_cat.categories.to_numpy(dtype=object), '')
+
+        # CSR adjacency over both edge directions, remembering which edge each entry came from
+        loop = self.edge_src == self.edge_dst
+        heads = np.concatenate([self.edge_src, self.edge_dst[~loop]])
+        tails = np.concatenate([self.edge_dst, self.edge_src[~loop]])
+        edge_ids = np.concatenate([np.arange(len(kept)), np.flatnonzero(~loop)]).astype(np.int32)
+        order = np.argsort(heads, kind='stable')
+        self.indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        self.indptr[1:] = np.bincount(heads, minlength=n_nodes).cumsum()
+        self.indices = tails[order]
+        self.edge_ids = edge_ids[order]
+
+        # Payloads carry type/relationship ids into these string tables; the last entry stands in for a missing value
+        self._type_table = self.type_cat.categories.tolist() + ['']
+        self._type_ids = np.where(self.type_cat.codes < 0, len(self._type_table) - 1, self.type_cat.codes)
+        self._rel_ids = np.where(self.rel_cat.codes < 0, len(self._rel_table) - 1, self.rel_cat.codes)
 
-    def get_graph_data(self, start_node=None, end_node=None, visible_relationships=None):
+        # Node size only depends on the node type
+        size_map = {'lead': 30, 'member': 25}
+        self._sizes = np.array([size_map.get(t, 20) for t in self._type_table])[self._type_ids]
+
+        # Edge ids grouped by relationship name, so a filter only touches the edges it selects
+        order = np.argsort(self._rel_ids, kind='stable')
+        bounds = np.searchsorted(self._rel_ids[order], np.arange(len(self._rel_table) + 1))
+        self._edges_by_rel = {rel: order[bounds[r]:bounds[r + 1]] for r, rel in enumerate(self._rel_table.tolist())}
+
+        # Sidebar options never change after load
+        self._node_options = self.node_index.tolist()
+        self._rel_types = self.rel_cat.categories.tolist()
+        self._layout = None
+        # Path filter masks, shared by every session on this graph; lru_cache stays consistent under concurrent reruns
+        self._path_masks = functools.lru_cache(maxsize=PATH_CACHE_SIZE)(self._nodes_on_simple_paths)
+
+    def get_graph_data(self, start_node=None, end_node=None, visible_relationships=None, cutoff=6):
         if start_node and end_node:
-            try:
-                paths = list(nx.all_simple_paths(self.G, source=start_node, target=end_node))
-                self.visible_nodes = set(node for path in paths for node in path)
-                self.visible_edges = set((path[i], path[i+1]) for path in paths for i in range(len(path)-1))
-            except nx.NetworkXNoPath:
+            node_mask, edge_mask, exact = self._path_masks(start_node, end_node, cutoff)
+            if not node_mask.any():
                 st.warning(f"No path found between {start_node} and {end_node}")
-                self.visible_nodes = set()
-                self.visible_edges = set()
+            elif not exact:
+                st.warning(
+                    f"Too many paths between {start_node} and {end_node} to list within {cutoff} hops; "
+                    "showing every node within reach of both (approximate). Try a shorter Max Path Length."
+                )
         else:
-            self.visible_nodes = set(self.G.nodes())
-            self.visible_edges = set(self.G.edges())
-
-        nodes = []
-        for node in self.G.nodes():
-            data = self.G.nodes[node]
-            nodes.append({
-                "id": node,
-                "type": data['type'],
-                "size": 30 if data['type'] == 'lead' else (25 if data['type'] == 'member' else 20),
-                "visible": node in self.visible_nodes
-            })
-        
-        links = []
-        for source, target in self.G.edges():
-            data = self.G.edges[source, target]
-            if visible_relationships is None or data.get('relationship', '') in visible_relationships:
-                links.append({
-                    "source": source,
-                    "target": target,
-                    "relationship": data.get('relationship', ''),
-                    "visible": (source, target) in self.visible_edges or (target, source) in self.visible_edges
-                })
-        
-        return {"nodes": nodes, "links": links}
+            node_mask = np.ones(len(self.node_index), dtype=bool)
+            edge_mask = np.ones(len(self.edge_src), dtype=bool)
+
+        keep = self._relationship_filter(visible_relationships)
+        if keep is not None:
+            edge_mask = edge_mask & keep
+
+        return {
+            "visible_nodes": node_mask,
+            "visible_links": edge_mask,
+            "relationship_links": keep
+        }
+
+    def _relationship_filter(self, visible_relationships):
+        # Edge mask for the selected relationship types, or None when every type is selected
+        if visible_relationships is None:
+            return None
+        selected = frozenset(visible_relationships)
+        if selected.issuperset(self.get_relationship_types()):
+            return None
+        keep = np.zeros(len(self.edge_src), dtype=bool)
+        for rel in selected & self._edges_by_rel.keys():
+            keep[self._edges_by_rel[rel]] = True
+        return keep
+
+    def get_graph_bytes(self):
+        # Full graph for the front end, decoded by decodeGraph in frontend/index.html. Inside zlib:
+        # varint header length, JSON header {ids, type_table, rel_table}, varint link count, then varint blocks
+        # of node type ids, node sizes, zigzag-delta sources, zigzag-delta targets and relationship ids
+        header = to_json({
+            "ids": self._node_options,
+            "type_table": self._type_table,
+            "rel_table": self._rel_table.tolist()
+        }).encode()
+        return zlib.compress(b"".join([
+            _varint_bytes([len(header)]),
+            header,
+            _varint_bytes([len(self.edge_src)]),
+            _varint_bytes(self._type_ids),
+            _varint_bytes(self._sizes),
+            _varint_bytes(_zigzag_deltas(self.edge_src)),
+            _varint_bytes(_zigzag_deltas(self.edge_dst)),
+            _varint_bytes(self._rel_ids)
+        ]))
+
+    def _neighbors_of(self, frontier):
+        # Concatenated CSR neighbor slices for an array of node ids
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return self.indices[offsets]
+
+    def _bfs_distances(self, start, cutoff, allowed=None):
+        # Hop distances from start (-1 if unreached), stopping at cutoff and optionally restricted to allowed nodes
+        dist = np.full(len(self.node_index), -1, dtype=np.int32)
+        dist[start] = 0
+        frontier = np.array([start])
+        for d in range(1, cutoff + 1):
+            reached = self._neighbors_of(frontier)
+            reached = reached[dist[reached] < 0]
+            if allowed is not None:
+                reached = reached[allowed[reached]]
+            frontier = np.unique(reached)
+            if not len(frontier):
+                break
+            dist[frontier] = d
+        return dist
+
+    def _nodes_on_simple_paths(self, source, target, cutoff):
+        # Node/edge masks covering every simple source-target path of at most cutoff hops (the union of
+        # nx.all_simple_paths). Hop distances to the target prune the search to prefixes that can still arrive in time
+        on_path = np.zeros(len(self.node_index), dtype=bool)
+        on_edge = np.zeros(len(self.edge_src), dtype=bool)
+        s = self.node_index.get_loc(source)
+        t = self.node_index.get_loc(target)
+        d_out = self._bfs_distances(s, cutoff)
+        if s == t or d_out[t] < 0:
+            return on_path, on_edge, True
+        d_in = self._bfs_distances(t, cutoff, allowed=d_out >= 0)
+
+        # Neighbor lists restricted to nodes within cutoff of both ends: (node, edge id, hops left to the target)
+        candidate = (d_in >= 0) & (d_out + d_in <= cutoff)
+        adj = {}
+        for u in np.flatnonzero(candidate).tolist():
+            lo, hi = self.indptr[u], self.indptr[u + 1]
+            nbrs, eids = self.indices[lo:hi], self.edge_ids[lo:hi]
+            keep = candidate[nbrs]
+            adj[u] = list(zip(nbrs[keep].tolist(), eids[keep].tolist(), d_in[nbrs[keep]].tolist()))
+
+        # Iterative depth-first search over simple paths; each arrival at the target marks the path it took.
+        # Dense graphs can have exponentially many paths, so the search gives up after PATH_SEARCH_STEPS
+        # neighbor visits and returns the nodes within cutoff of both ends instead (a superset of the exact answer)
+        path, path_edges, on_stack = [s], [], {s}
+        stack = [iter(adj[s])]
+        steps = 0
+        while stack:
+            if steps > PATH_SEARCH_STEPS:
+                u, v = self.edge_src, self.edge_dst
+                fits = (d_out[u] + 1 + d_in[v] <= cutoff) | (d_out[v] + 1 + d_in[u] <= cutoff)
+                return candidate, candidate[u] & candidate[v] & fits, False
+            for w, e, rest in stack[-1]:
+                steps += 1
+                if w in on_stack or len(path) + rest > cutoff:
+                    continue
+                if w == t:
+                    on_path[path] = True
+                    on_edge[path_edges] = True
+                    on_edge[e] = True
+                    continue
+                path.append(w)
+                path_edges.append(e)
+                on_stack.add(w)
+                stack.append(iter(adj[w]))
+                break
+            else:
+                stack.pop()
+                on_stack.discard(path.pop())
+                if path_edges:
+                    path_edges.pop()
+        on_path[t] = on_path[s]
+        return on_path, on_edge, True
+
+    def get_layout(self):
+        # Force layout for the frozen view, computed once per graph and scaled onto the 800x600 drawing area
+        if self._layout is None:
+            n_nodes = len(self.node_index)
+            xy = np.zeros((n_nodes, 2))
+            if n_nodes > 1:
+                xy = _force_layout(n_nodes, self.edge_src, self.edge_dst)
+                xy -= (xy.max(0) + xy.min(0)) / 2
+                xy /= max(np.abs(xy).max(), 1e-12)
+            self._layout = np.round(xy * [350, 250] + [400, 300], 1)
+        return self._layout
 
     def get_node_options(self):
-        return sorted(list(self.G.nodes()))
+        return self._node_options
 
     def get_relationship_types(self):
-        return sorted(set(data['relationship'] for _, _, data in self.G.edges(data=True)))
-
-    def expand_node(self, node, visible_relationships=None):
-        neighbors = set(self.G.neighbors(node))
-        self.visible_nodes.update(neighbors)
-        self.visible_nodes.add(node)
-        new_edges = set((node, neighbor) for neighbor in neighbors)
-        self.visible_edges.update(new_edges)
-
-        new_nodes = []
-        for new_node in neighbors.union({node}):
-            data = self.G.nodes[new_node]
-            new_nodes.append({
-                "id": new_node,
-                "type": data['type'],
-                "size": 30 if data['type'] == 'lead' else (25 if data['type'] == 'member' else 20),
-                "visible": True
-            })
-
-        new_links = []
-        for source, target in new_edges:
-            data = self.G.edges[source, target]
-            if visible_relationships is None or data.get('relationship', '') in visible_relationships:
-                new_links.append({
-                    "source": source,
-                    "target": target,
-                    "relationship": data.get('relationship', ''),
-                    "visible": True
-                })
-
-        return {"nodes": new_nodes, "links": new_links}
-
-# D3.js visualization code with download functionality
-D3_CODE = """
-<!DOCTYPE html>
-<html>
-<head>
-    <script src="https://d3js.org/d3.v5.min.js"></script>
-    <script src="https://html2canvas.hertzen.com/dist/html2canvas.min.js"></script>
-    <style>
-        #graph-container {
-            position: relative;
-            width: 800px;
-            height: 600px;
-        }
-        .links line {
-            stroke-linecap: round;
-        }
-        .node-labels {
-            pointer-events: none;
-            user-select: none;
-        }
-        .link-labels {
-            pointer-events: none;
-            user-select: none;
-        }
-        .download-panel {
-            position: absolute;
-            top: 10px;
-            right: 10px;
-            background: white;
-            padding: 10px;
-            border-radius: 5px;
-            box-shadow: 0 2px 5px rgba(0,0,0,0.2);
-            z-index: 1000;
-        }
-        .download-button {
-            display: block;
-            margin: 5px 0;
-            padding: 8px 16px;
-            background-color: #4CAF50;
-            color: white;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 14px;
-            width: 100%;
-        }
-        .download-button:hover {
-            background-color: #45a049;
-        }
-        .reset-button {
-            display: block;
-            margin: 5px 0;
-            padding: 8px 16px;
-            background-color: #f44336;
-            color: white;
-            border: none;
-            border-radius: 4px;
-            cursor: pointer;
-            font-size: 14px;
-            width: 100%;
-        }
-        .reset-button:hover {
-            background-color: #da190b;
-        }
-    </style>
-</head>
-<body>
-    <div id="graph-container">
-        <div class="download-panel">
-            <button class="download-button" onclick="downloadSVG()">Download SVG</button>
-            <button class="download-button" onclick="downloadPNG()">Download PNG</button>
-            <button class="reset-button" onclick="resetPositions()">Reset Positions</button>
-        </div>
-    </div>
-
-    <script>
-        const data = __DATA__;
-        const colorScheme = __COLOR_SCHEME__;
-        
-        const typeColorMap = {
-            'lead': colorScheme[0],
-            'member': colorScheme[1],
-            'child': colorScheme[2]
-        };
-        
-        const width = 800;
-        const height = 600;
-        
-        const svg = d3.select("#graph-container")
-            .append("svg")
-            .attr("width", width)
-            .attr("height", height)
-            .attr("id", "graph-svg");
-        
-        svg.append("rect")
-            .attr("width", width)
-            .attr("height", height)
-            .attr("fill", "white");
-            
-        const g = svg.append("g");
-        
-        const zoom = d3.zoom()
-            .scaleExtent([0.5, 5])
-            .on("zoom", () => {
-                g.attr("transform", d3.event.transform);
-            });
-            
-        svg.call(zoom);
-        
-        // Define arrow markers with different colors
-        const arrowColors = ['#999', '#666', '#333'];
-        svg.append("defs").selectAll("marker")
-            .data(arrowColors)
-            .enter().append("marker")
-            .attr("id", (d, i) => `arrow-${i}`)
-            .attr("viewBox", "0 -5 10 10")
-            .attr("refX", 28)  // Adjusted to position arrow at node edge
-            .attr("refY", 0)
-            .attr("markerWidth", 8)
-            .attr("markerHeight", 8)
-            .attr("orient", "auto")
-            .append("path")
-            .attr("d", "M0,-5L10,0L0,5")
-            .attr("fill", d => d);
-            
-        const simulation = d3.forceSimulation()
-            .force("link", d3.forceLink().id(d => d.id).distance(200))
-            .force("charge", d3.forceManyBody().strength(-700))
-            .force("center", d3.forceCenter(width / 2, height / 2));
-            
-        const linkGroup = g.append("g").attr("class", "links");
-        const nodeGroup = g.append("g").attr("class", "nodes");
-        const nodeLabelGroup = g.append("g").attr("class", "node-labels");
-        const linkLabelGroup = g.append("g").attr("class", "link-labels");
-        
-        let link = linkGroup.selectAll("line");  // Changed from path to line
-        let node = nodeGroup.selectAll("rect");
-        let nodeLabel = nodeLabelGroup.selectAll("text");
-        let linkLabel = linkLabelGroup.selectAll("text");
-
-        const drag = d3.drag()
-            .on("start", dragstarted)
-            .on("drag", dragged)
-            .on("end", dragended);
-        
-        function updateGraph() {
-            // Update links - now using straight lines
-            link = link.data(data.links, d => `${d.source.id || d.source}-${d.target.id || d.target}`);
-            link.exit().remove();
-            
-            const linkEnter = link.enter().append("line")
-                .attr("stroke", "#999")
-                .attr("stroke-opacity", 0.6)
-                .attr("stroke-width", 1.5)
-                .attr("marker-end", (d, i) => `url(#arrow-${i % 3})`);  // Cycle through arrow colors
-                
-            link = linkEnter.merge(link)
-                .style("visibility", d => d.visible ? "visible" : "hidden");
-                
-            // Rest of the update function remains the same
-            node = node.data(data.nodes, d => d.id);
-            node.exit().remove();
-            
-            const nodeEnter = node.enter().append("rect")
-                .attr("width", d => d.size * 4)
-                .attr("height", d => d.size * 2)
-                .attr("rx", 5)
-                .attr("ry", 5)
-                .attr("fill", d => typeColorMap[d.type])
-                .call(drag);
-                    
-            node = nodeEnter.merge(node)
-                .style("opacity", d => d.visible ? 1 : 0.3);
-                
-            nodeLabel = nodeLabel.data(data.nodes, d => d.id);
-            nodeLabel.exit().remove();
-            
-            const nodeLabelEnter = nodeLabel.enter().append("text")
-                .attr("text-anchor", "middle")
-                .attr("dominant-baseline", "middle")
-                .style("font-size", "12px")
-                .text(d => d.id);
-                
-            nodeLabel = nodeLabelEnter.merge(nodeLabel)
-                .style("opacity", d => d.visible ? 1 : 0.3);
-                
-            linkLabel = linkLabel.data(data.links, d => `${d.source.id || d.source}-${d.target.id || d.target}`);
-            linkLabel.exit().remove();
-            
-            const linkLabelEnter = linkLabel.enter().append("text")
-                .attr("font-size", "10px")
-                .attr("fill", "#666")
-                .text(d => d.relationship);
-                
-            linkLabel = linkLabelEnter.merge(linkLabel)
-                .style("visibility", d => d.visible ? "visible" : "hidden");
-                
-            simulation.nodes(data.nodes);
-            simulation.force("link").links(data.links);
-            simulation.alpha(1).restart();
-        }
-        
-        // Drag functions remain the same
-        function dragstarted(d) {
-            if (!d3.event.active) simulation.alphaTarget(0.3).restart();
-            d.fx = d.x;
-            d.fy = d.y;
-        }
-        
-        function dragged(d) {
-            d.fx = d3.event.x;
-            d.fy = d3.event.y;
-            d.x = d3.event.x;
-            d.y = d3.event.y;
-        }
-        
-        function dragended(d) {
-            if (!d3.event.active) simulation.alphaTarget(0);
-        }
+        return self._rel_types
 
-        function resetPositions() {
-            data.nodes.forEach(d => {
-                d.fx = null;
-                d.fy = null;
-            });
-            simulation.alpha(1).restart();
-        }
-        
-        // Updated tick function for straight lines
-        simulation.on("tick", () => {
-            link
-                .attr("x1", d => d.source.x)
-                .attr("y1", d => d.source.y)
-                .attr("x2", d => d.target.x)
-                .attr("y2", d => d.target.y);
-            
-            node
-                .attr("x", d => d.x - d.size * 2)
-                .attr("y", d => d.y - d.size);
-                
-            nodeLabel
-                .attr("x", d => d.x)
-                .attr("y", d => d.y);
-                
-            linkLabel
-                .attr("x", d => (d.source.x + d.target.x) / 2)
-                .attr("y", d => (d.source.y + d.target.y) / 2 - 5);
-        });
-        
-        // Download functions remain the same
-        function downloadSVG() {
-            const svgElement = document.getElementById("graph-svg");
-            const svgData = new XMLSerializer().serializeToString(svgElement);
-            const svgBlob = new Blob([svgData], {type: "image/svg+xml;charset=utf-8"});
-            const svgUrl = URL.createObjectURL(svgBlob);
-            
-            const downloadLink = document.createElement("a");
-            downloadLink.href = svgUrl;
-            downloadLink.download = "knowledge_graph.svg";
-            document.body.appendChild(downloadLink);
-            downloadLink.click();
-            document.body.removeChild(downloadLink);
-            URL.revokeObjectURL(svgUrl);
-        }
-        
-        async function downloadPNG() {
-            const svgElement = document.getElementById("graph-svg");
-            const canvas = document.createElement('canvas');
-            const context = canvas.getContext('2d');
-            
-            canvas.width = width;
-            canvas.height = height;
-            
-            const image = new Image();
-            const svgData = new XMLSerializer().serializeToString(svgElement);
-            const svgBlob = new Blob([svgData], {type: 'image/svg+xml;charset=utf-8'});
-            const svgUrl = URL.createObjectURL(svgBlob);
-            
-            image.onload = () => {
-                context.fillStyle = 'white';
-                context.fillRect(0, 0, canvas.width, canvas.height);
-                context.drawImage(image, 0, 0);
-                
-                const pngUrl = canvas.toDataURL('image/png');
-                const downloadLink = document.createElement('a');
-                downloadLink.href = pngUrl;
-                downloadLink.download = 'knowledge_graph.png';
-                document.body.appendChild(downloadLink);
-                downloadLink.click();
-                document.body.removeChild(downloadLink);
-                
-                URL.revokeObjectURL(svgUrl);
-            };
-            
-            image.src = svgUrl;
-        }
-        
-        updateGraph();
-    </script>
-</body>
-</html>
-"""
+    def expand_node(self, node, visible_nodes, visible_links, visible_relationships=None):
+        # The graph is shared by every session, so the caller passes its own visibility masks and applies the delta
+        i = self.node_index.get_loc(node)
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        neighbors = self.indices[lo:hi]
+        edge_ids = self.edge_ids[lo:hi]
+
+        # Only the delta is returned, as node and link indices: elements already on screen are skipped
+        fresh = np.union1d(neighbors, [i])
+        show = ~visible_links[edge_ids]
+        keep = self._relationship_filter(visible_relationships)
+        if keep is not None:
+            show &= keep[edge_ids]
+        return {"nodes": fresh[~visible_nodes[fresh]], "links": edge_ids[show]}
+
+def to_json(obj):
+    # Graph payloads are plain lists/dicts/str/int, which both encoders handle identically
+    if orjson is None:
+        return json.dumps(obj)
+    return orjson.dumps(obj).decode()
+
+def _varint_bytes(values):
+    # Unsigned LEB128 (7 bits per byte, high bit set on all but the last byte) for a non-negative integer array
+    values = np.asarray(values, dtype=np.uint64)
+    thresholds = np.left_shift(np.uint64(1), np.arange(7, 64, 7, dtype=np.uint64))
+    n_bytes = 1 + (values[:, None] >= thresholds).sum(1)
+    owner = np.repeat(np.arange(len(values)), n_bytes)
+    shift = np.arange(len(owner)) - np.repeat(np.cumsum(n_bytes) - n_bytes, n_bytes)
+    out = (values[owner] >> (7 * shift).astype(np.uint64)) & np.uint64(0x7F)
+    out |= (shift < n_bytes[owner] - 1).astype(np.uint64) << np.uint64(7)
+    return out.astype(np.uint8).tobytes()
+
+def _zigzag_deltas(values):
+    # Differences to the previous value, with signs folded into the low bit so small steps stay small
+    deltas = np.diff(np.asarray(values, dtype=np.int64), prepend=0)
+    return (deltas << 1) ^ (deltas >> 63)
+
+def pack_mask(mask):
+    # Boolean mask as a hex string of packed bits, decoded by unpackMask in frontend/index.html
+    return np.packbits(mask).tobytes().hex()
+
+# D3.js front end (frontend/index.html), mounted once per key and sent new args on each rerun
+kg_component = components.declare_component("kg_d3", path=str(Path(__file__).parent / "frontend"))
 
 # Streamlit app
+def no_expansions(kg):
+    # Nodes and links a session has shown by double-clicking, on top of the filter masks
+    return np.zeros(len(kg.node_index), dtype=bool), np.zeros(len(kg.edge_src), dtype=bool)
+
+def node_picker(label, node_options, key):
+    # Large graphs get a search box and a short list of matches instead of shipping every name to the browser
+    if len(node_options) <= NODE_PICKER_LIMIT:
+        return st.selectbox(label, node_options, key=key)
+    query = st.text_input(f"Search {label}", key=f"{key}_query").strip()
+    if not query:
+        return None
+    needle = query.lower()
+    matches = list(itertools.islice((n for n in node_options if needle in n.lower()), NODE_PICKER_MATCHES))
+    if not matches:
+        matches = difflib.get_close_matches(query, node_options, n=NODE_PICKER_MATCHES)
+    if not matches:
+        st.caption(f"No nodes match '{query}'")
+        return None
+    return st.selectbox(label, matches, key=key)
+
 def main():
     st.set_page_config(page_title="Knowledge Graph Visualizer", layout="wide")
     st.title("Interactive Knowledge Graph Visualizer")
     
     # File upload
-    excel_file = st.file_uploader("Upload Excel file", type="xlsx")
+    excel_file = st.file_uploader("Upload Excel file", type=["xlsx", "parquet"])
     
     if excel_file is not None:
         try:
             # Initialize the graph
-            kg = HierarchicalKnowledgeGraph(excel_file)
+            file_bytes = excel_file.getvalue()
+            kg = build_kg(file_bytes, excel_file.name)
+            
+            # Serialize the full graph once per upload; reruns only ship visibility. Keyed on the content, like
+            # build_kg, so an edited workbook with the same name and size still gets a fresh payload
+            graph_id = hashlib.sha1(file_bytes).hexdigest()
+            if st.session_state.get("graph_id") != graph_id:
+                st.session_state["graph"] = kg.get_graph_bytes()
+                st.session_state["graph_id"] = graph_id
+                st.session_state["path_filter"] = None
+                st.session_state["filter_epoch"] = 0
+                st.session_state["expanded"] = no_expansions(kg)
             
             # Create columns for layout
             left_col, right_col = st.columns([1, 3])
@@ -421,8 +445,9 @@ def main():
                 # Path filter
                 st.subheader("Path Filter")
                 node_options = kg.get_node_options()
-                start_node = st.selectbox("Start Node", node_options, key="start_node")
-                end_node = st.selectbox("End Node", node_options, key="end_node")
+                start_node = node_picker("Start Node", node_options, key="start_node")
+                end_node = node_picker("End Node", node_options, key="end_node")
+                max_hops = st.selectbox("Max Path Length", [2, 3, 4, 5, 6, 8, 10], index=4, key="max_hops")
                 
                 # Relationship filter
                 st.subheader("Relationship Filter")
@@ -433,32 +458,92 @@ def main():
                     default=relationship_types
                 )
                 
+                # Layout
+                st.subheader("Layout")
+                freeze_layout = st.checkbox(
+                    "Freeze Layout",
+                    value=len(node_options) > FREEZE_LAYOUT_NODES,
+                    key="freeze_layout",
+                    help="Place nodes once on the server and skip the live force simulation"
+                )
+                
                 # Color customization
                 st.subheader("Color Settings")
                 lead_color = st.color_picker("Lead Node Color", "#FF6B6B")
                 member_color = st.color_picker("Member Node Color", "#4ECDC4")
                 child_color = st.color_picker("Child Node Color", "#45B7D1")
                 
-                # Apply filters button
+                # The applied path filter stays active across reruns (double-click events included) until cleared
+                path_filter = st.session_state["path_filter"]
                 if st.button("Apply Filters"):
-                    graph_data = kg.get_graph_data(start_node, end_node, visible_relationships)
+                    path_filter = (start_node, end_node, max_hops)
+                if st.button("Clear Filters"):
+                    path_filter = None
+                # Expansions belong to the filter they were made under; a different filter starts without them
+                if path_filter != st.session_state["path_filter"]:
+                    st.session_state["path_filter"] = path_filter
+                    st.session_state["filter_epoch"] += 1
+                    st.session_state["expanded"] = no_expansions(kg)
+                if path_filter:
+                    start, end, cutoff = path_filter
+                    graph_data = kg.get_graph_data(start, end, visible_relationships, cutoff=cutoff)
                 else:
                     graph_data = kg.get_graph_data(visible_relationships=visible_relationships)
                 
                 # Display graph statistics
                 st.subheader("Graph Statistics")
-                st.write(f"Total Nodes: {len(graph_data['nodes'])}")
-                st.write(f"Visible Nodes: {sum(1 for node in graph_data['nodes'] if node['visible'])}")
-                st.write(f"Total Relationships: {len(graph_data['links'])}")
-                st.write(f"Visible Relationships: {sum(1 for link in graph_data['links'] if link['visible'])}")
+                st.write(f"Total Nodes: {len(kg.node_index)}")
+                st.write(f"Visible Nodes: {np.count_nonzero(graph_data['visible_nodes'])}")
+                st.write(f"Total Relationships: {len(kg.edge_src)}")
+                st.write(f"Visible Relationships: {np.count_nonzero(graph_data['visible_links'])}")
 
             with right_col:
                 # Prepare color scheme
                 color_scheme = [lead_color, member_color, child_color]
                 
                 # Render D3.js visualization
-                d3_code = D3_CODE.replace("__DATA__", json.dumps(graph_data)).replace("__COLOR_SCHEME__", json.dumps(color_scheme))
-                components.html(d3_code, height=700, width=None)
+                use_server_layout = freeze_layout or len(node_options) > SEED_LAYOUT_NODES
+                layout = kg.get_layout().ravel().tolist() if use_server_layout else None
+                # The page ORs its expanded elements into these masks, limiting expanded links to the selected
+                # relationships, and drops its expansions when the epoch (the applied path filter) changes
+                keep = graph_data['relationship_links']
+                visibility = {
+                    "nodes": pack_mask(graph_data['visible_nodes']),
+                    "links": pack_mask(graph_data['visible_links']),
+                    "relationships": None if keep is None else pack_mask(keep),
+                    "epoch": st.session_state["filter_epoch"]
+                }
+                # Only a new graph gets a fresh component; filters, colors and the layout mode update the mounted one in place
+                component_key = f"kg-{graph_id}"
+                
+                # A double-clicked node comes back as the component value; answer once with only the newly shown indices
+                expansion = None
+                event = st.session_state.get(component_key)
+                if event and event.get("seq") != st.session_state.get("expand_seq"):
+                    st.session_state["expand_seq"] = event["seq"]
+                    expanded_nodes, expanded_links = st.session_state["expanded"]
+                    delta = kg.expand_node(
+                        event["node"],
+                        graph_data['visible_nodes'] | expanded_nodes,
+                        graph_data['visible_links'] | (expanded_links if keep is None else expanded_links & keep),
+                        visible_relationships
+                    )
+                    expansion = {
+                        "seq": event["seq"],
+                        "nodes": delta["nodes"].tolist(),
+                        "links": delta["links"].tolist()
+                    }
+                    expanded_nodes[expansion["nodes"]] = True
+                    expanded_links[expansion["links"]] = True
+                kg_component(
+                    graph=st.session_state["graph"],
+                    visibility=visibility,
+                    layout=layout,
+                    frozen=freeze_layout,
+                    colors=color_scheme,
+                    expansion=expansion,
+                    key=component_key
+                )
 
         except Exception as e:
             st.error(f"Error processing the file: {str(e)}")
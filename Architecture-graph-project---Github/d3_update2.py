@@ -1,5 +1,4 @@
 import pandas as pd
-import networkx as nx
 import json
 import streamlit as st
 import streamlit.components.v1 as components
@@ -9,65 +8,96 @@ import base64
 class HierarchicalKnowledgeGraph:
     def __init__(self, excel_file):
         self.df = pd.read_excel(excel_file)
-        self.G = nx.Graph()
+        # Undirected adjacency (neighbor -> relationship) and node types in plain dicts instead of a NetworkX graph
+        self._adj = {}
+        self._type = {}
         self.load_initial_graph()
         self.visible_nodes = set()
         self.visible_edges = set()
 
     def load_initial_graph(self):
-        for _, row in self.df.iterrows():
-            node = str(row['node'])
-            parent = str(row['parent']) if pd.notnull(row['parent']) else None
-            
-            self.G.add_node(node, type=row['type'])
-            if parent and parent != 'nan':
-                self.G.add_edge(parent, node, relationship=row['relationship'])
+        # Names and the parent test are computed column-wise; only the adjacency inserts remain a loop
+        nodes = self.df['node'].astype(str)
+        parents = self.df['parent'].astype(str)
+        has_parent = self.df['parent'].notna() & ~parents.isin(['', 'nan'])
+
+        # Nodes in first-seen order, each row contributing its node and then its parent
+        names = pd.DataFrame({'node': nodes, 'parent': parents.where(has_parent)}).to_numpy().ravel()
+        self._adj = {name: {} for name in names[pd.notna(names)]}
+        self._type = dict(zip(nodes, self.df['type']))
+
+        for parent, node, relationship in zip(parents[has_parent], nodes[has_parent], self.df['relationship'][has_parent]):
+            self._adj[parent][node] = relationship
+            self._adj[node][parent] = relationship
+
+    def _edges(self):
+        # Each undirected edge once as (source, target, relationship), in the order NetworkX would list them
+        seen = set()
+        for source, neighbors in self._adj.items():
+            for target, relationship in neighbors.items():
+                if target not in seen:
+                    yield source, target, relationship
+            seen.add(source)
+
+    def _simple_paths(self, source, target):
+        # Depth-first search with an explicit stack of neighbor iterators (the nx.all_simple_paths algorithm)
+        visited = {source: True}
+        stack = [iter(self._adj[source])]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                visited.popitem()
+            elif child in visited:
+                continue
+            elif child == target:
+                yield list(visited) + [child]
+            else:
+                visited[child] = True
+                stack.append(iter(self._adj[child]))
 
     def get_graph_data(self, start_node=None, end_node=None, visible_relationships=None):
         if start_node and end_node:
-            try:
-                paths = list(nx.all_simple_paths(self.G, source=start_node, target=end_node))
-                self.visible_nodes = set(node for path in paths for node in path)
-                self.visible_edges = set((path[i], path[i+1]) for path in paths for i in range(len(path)-1))
-            except nx.NetworkXNoPath:
+            paths = list(self._simple_paths(start_node, end_node))
+            if not paths:
                 st.warning(f"No path found between {start_node} and {end_node}")
-                self.visible_nodes = set()
-                self.visible_edges = set()
+            self.visible_nodes = set(node for path in paths for node in path)
+            self.visible_edges = set((path[i], path[i+1]) for path in paths for i in range(len(path)-1))
         else:
-            self.visible_nodes = set(self.G.nodes())
-            self.visible_edges = set(self.G.edges())
+            self.visible_nodes = set(self._adj)
+            self.visible_edges = set((source, target) for source, target, _ in self._edges())
 
-        nodes = []
-        for node in self.G.nodes():
-            data = self.G.nodes[node]
-            nodes.append({
+        nodes = [
+            {
                 "id": node,
-                "type": data['type'],
-                "size": 30 if data['type'] == 'lead' else (25 if data['type'] == 'member' else 20),
+                "type": self._type.get(node),
+                "size": 30 if self._type.get(node) == 'lead' else (25 if self._type.get(node) == 'member' else 20),
                 "visible": node in self.visible_nodes
-            })
+            }
+            for node in self._adj
+        ]
         
-        links = []
-        for source, target in self.G.edges():
-            data = self.G.edges[source, target]
-            if visible_relationships is None or data.get('relationship', '') in visible_relationships:
-                links.append({
-                    "source": source,
-                    "target": target,
-                    "relationship": data.get('relationship', ''),
-                    "visible": (source, target) in self.visible_edges or (target, source) in self.visible_edges
-                })
+        links = [
+            {
+                "source": source,
+                "target": target,
+                "relationship": relationship,
+                "visible": (source, target) in self.visible_edges or (target, source) in self.visible_edges
+            }
+            for source, target, relationship in self._edges()
+            if visible_relationships is None or relationship in visible_relationships
+        ]
         
         return {"nodes": nodes, "links": links}
 
     def get_node_options(self):
-        return sorted(list(self.G.nodes()))
+        return sorted(self._adj)
 
     def get_relationship_types(self):
-        return sorted(set(data['relationship'] for _, _, data in self.G.edges(data=True)))
+        return sorted(set(relationship for _, _, relationship in self._edges()))
 
     def expand_node(self, node, visible_relationships=None):
-        neighbors = set(self.G.neighbors(node))
+        neighbors = set(self._adj[node])
         self.visible_nodes.update(neighbors)
         self.visible_nodes.add(node)
         new_edges = set((node, neighbor) for neighbor in neighbors)
@@ -75,22 +105,22 @@ class HierarchicalKnowledgeGraph:
 
         new_nodes = []
         for new_node in neighbors.union({node}):
-            data = self.G.nodes[new_node]
+            node_type = self._type.get(new_node)
             new_nodes.append({
                 "id": new_node,
-                "type": data['type'],
-                "size": 30 if data['type'] == 'lead' else (25 if data['type'] == 'member' else 20),
+                "type": node_type,
+                "size": 30 if node_type == 'lead' else (25 if node_type == 'member' else 20),
                 "visible": True
             })
 
         new_links = []
         for source, target in new_edges:
-            data = self.G.edges[source, target]
-            if visible_relationships is None or data.get('relationship', '') in visible_relationships:
+            relationship = self._adj[source][target]
+            if visible_relationships is None or relationship in visible_relationships:
                 new_links.append({
                     "source": source,
                     "target": target,
-                    "relationship": data.get('relationship', ''),
+                    "relationship": relationship,
                     "visible": True
                 })
 